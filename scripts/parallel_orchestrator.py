@@ -10,25 +10,56 @@ Usage:
 import os
 import json
 import sys
-import uuid
 import time
-import subprocess
+import atexit
+import asyncio
+import argparse
 import threading
+import functools
+import contextlib
+import shutil
+import tempfile
+import subprocess
 from pathlib import Path
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+# Optional fast JSON encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Debug logging
 DEBUG_LOG = Path.home() / ".claude" / "data" / "hook_debug.log"
+DEBUG_BUFFER_SIZE = 1 << 14
+_debug_fh = None
+_debug_lock = threading.Lock()
+_ts_cache = (0, "")
+
+def timestamp() -> str:
+    """Local ISO-8601 timestamp; the date/time part is formatted once per second."""
+    global _ts_cache
+    sec, ns = divmod(time.time_ns(), 1_000_000_000)
+    cached_sec, prefix = _ts_cache
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec))
+        _ts_cache = (sec, prefix)
+    return f"{prefix}.{ns // 1000:06d}"
 
 def debug_log(message: str):
-    """Write debug log."""
+    """Write debug log through one buffered handle, flushed at exit."""
+    global _debug_fh
     try:
-        DEBUG_LOG.parent.mkdir(parents=True, exist_ok=True)
-        with open(DEBUG_LOG, "a", encoding="utf-8") as f:
-            timestamp = datetime.now().isoformat()
-            f.write(f"[{timestamp}] parallel_orchestrator.py: {message}\n")
+        with _debug_lock:
+            if _debug_fh is None:
+                if not _dirs_ready:
+                    DEBUG_LOG.parent.mkdir(parents=True, exist_ok=True)
+                _debug_fh = open(DEBUG_LOG, "a", buffering=DEBUG_BUFFER_SIZE, encoding="utf-8")
+                atexit.register(_debug_fh.close)
+            _debug_fh.write(f"[{timestamp()}] parallel_orchestrator.py: {message}\n")
     except Exception as e:
         sys.stderr.write(f"DEBUG_LOG_ERROR: {e}\n")
 
@@ -36,21 +67,124 @@ def debug_log(message: str):
 CLAUDE_DIR = Path.home() / ".claude"
 DATA_DIR = CLAUDE_DIR / "data"
 ORCHESTRATOR_STATE_FILE = DATA_DIR / "orchestrator-state.json"
+ORCHESTRATOR_EVENTS_FILE = DATA_DIR / "orchestrator-state.jsonl"
+REPORTS_DIR = DATA_DIR / "reports"
+_dirs_ready = False
+
+# Task - Agent matching: (perspective, agent, skills)
+AGENT_MAP: Tuple[Tuple[str, str, str], ...] = (
+    ("Architecture & Security", "security-auditor", "security-checklist, api-patterns"),
+    ("Backend Implementation", "backend-specialist", "nodejs-best-practices, api-patterns"),
+    ("Frontend & UI/UX", "frontend-specialist", "react-patterns, tailwind-patterns"),
+    ("Testing", "test-engineer", "testing-patterns, webapp-testing"),
+    ("DevOps & Performance", "devops-engineer", "deployment-procedures, server-management"),
+)
+
+def ensure_dirs():
+    """Create data, reports and log directories once per process."""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    DEBUG_LOG.parent.mkdir(parents=True, exist_ok=True)
+    _dirs_ready = True
+
+def new_id() -> str:
+    """Opaque 32-hex-char id for sessions and agents."""
+    return os.urandom(16).hex()
+
+def json_bytes(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# Streaming limits
+STREAM_CHUNK_SIZE = 1 << 16
+REPORT_BUFFER_SIZE = 1 << 20
+RESULT_TAIL_BYTES = 2048
+EVENTS_BUFFER_SIZE = 1 << 16
+SAVE_INTERVAL = 1.0  # seconds between progress snapshots
+
+async def _adopt_pipe(loop: asyncio.AbstractEventLoop, pipe) -> asyncio.StreamReader:
+    """Attach a blocking Popen pipe to the event loop as a StreamReader."""
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return reader
+
+async def _drain(reader: asyncio.StreamReader, out_fh=None) -> bytes:
+    """Read a stream to EOF, optionally copying it to out_fh; returns only the tail."""
+    tail = b""
+    while True:
+        chunk = await reader.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        if out_fh is not None:
+            out_fh.write(chunk)
+        tail = (tail + chunk)[-RESULT_TAIL_BYTES:]
+    return tail
 
+@dataclass(slots=True)
 class AgentTask:
-    def __init__(self, agent_id: str, prompt: str, name: str = ""):
-        self.agent_id = agent_id
-        self.prompt = prompt
-        self.name = name or f"Agent-{agent_id[:4]}"
-        self.status = "pending"
-        self.result = ""
-        self.started_at = None
-        self.ended_at = None
-
-    def execute(self, test_mode: bool = False):
+    """Single agent run."""
+    agent_id: str
+    prompt: str
+    name: str = ""
+    output_file: Optional[Path] = None
+    status: str = "pending"  # pending, running, completed, failed
+    result_tail: str = ""
+    started_at: Optional[str] = None
+    ended_at: Optional[str] = None
+    error: str = ""
+
+    def __post_init__(self):
+        self.name = self.name or f"Agent-{self.agent_id[:4]}"
+
+    async def _spawn(self, spawn_pool: Optional[ThreadPoolExecutor],
+                     spawn_sem: Optional[asyncio.Semaphore] = None):
+        """Start the claude CLI; returns (stdout, stderr, wait) for the child.
+
+        On POSIX, fork+exec runs on spawn_pool so starting one agent never stalls
+        the event loop for the others; the child's pipes are then adopted by the loop.
+        spawn_sem bounds how many spawns are in flight at once.
+        """
+        async with spawn_sem or contextlib.nullcontext():
+            return await self._start_process(spawn_pool)
+
+    async def _start_process(self, spawn_pool: Optional[ThreadPoolExecutor]):
+        if os.name != "posix" or spawn_pool is None:
+            process = await asyncio.create_subprocess_exec(
+                "claude", self.prompt,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            return process.stdout, process.stderr, process.wait
+
+        loop = asyncio.get_running_loop()
+        process = await loop.run_in_executor(spawn_pool, functools.partial(
+            subprocess.Popen,
+            ["claude", self.prompt],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        ))
+        stdout = await _adopt_pipe(loop, process.stdout)
+        stderr = await _adopt_pipe(loop, process.stderr)
+
+        async def wait():
+            # Pipes are at EOF by the time this is awaited, so the reap is short
+            return await loop.run_in_executor(spawn_pool, process.wait)
+
+        return stdout, stderr, wait
+
+    async def execute(self, test_mode: bool = False, spawn_pool: Optional[ThreadPoolExecutor] = None,
+                      on_transition: Optional[Callable[["AgentTask"], None]] = None,
+                      spawn_sem: Optional[asyncio.Semaphore] = None):
         debug_log(f"AgentTask.execute: {self.name}, test_mode={test_mode}")
         self.status = "running"
-        self.started_at = datetime.now().isoformat()
+        self.started_at = timestamp()
+        if on_transition:
+            on_transition(self)
 
         try:
             if test_mode:
@@ -58,25 +192,31 @@ class AgentTask:
                 import random
                 sleep_time = random.uniform(2, 5)
                 debug_log(f"Mock execution: {self.name}, sleep={sleep_time:.2f}s")
-                time.sleep(sleep_time)
-                self.result = f"MOCK RESULT for {self.name}: Analyzed {self.prompt[:30]}... found 3 issues."
+                await asyncio.sleep(sleep_time)
+                self.result_tail = f"MOCK RESULT for {self.name}: Analyzed {self.prompt[:30]}... found 3 issues."
+                if self.output_file:
+                    self.output_file.write_text(self.result_tail, encoding="utf-8")
                 self.status = "completed"
             else:
                 # Real execution using Claude Code CLI
                 debug_log(f"Real execution: claude {self.prompt[:50]}...")
-                process = subprocess.Popen(
-                    ["claude", self.prompt],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    encoding="utf-8"
-                )
+                stdout_reader, stderr_reader, wait = await self._spawn(spawn_pool, spawn_sem)
 
-                stdout, stderr = process.communicate()
-                debug_log(f"Process finished: {self.name}, returncode={process.returncode}")
+                # Stream stdout straight to disk; only the tails stay in memory
+                out_fh = open(self.output_file, "wb") if self.output_file else None
+                try:
+                    stdout_tail, stderr_tail = await asyncio.gather(
+                        _drain(stdout_reader, out_fh), _drain(stderr_reader)
+                    )
+                finally:
+                    if out_fh:
+                        out_fh.close()
+                returncode = await wait()
+                stderr = stderr_tail.decode("utf-8", errors="ignore")
+                debug_log(f"Process finished: {self.name}, returncode={returncode}")
 
-                self.result = stdout
-                if process.returncode != 0:
+                self.result_tail = stdout_tail.decode("utf-8", errors="ignore")
+                if returncode != 0:
                     self.status = "failed"
                     self.error = stderr
                     debug_log(f"Agent {self.name} failed: {stderr[:100]}")
@@ -89,7 +229,9 @@ class AgentTask:
             self.error = str(e)
             debug_log(f"Agent {self.name} exception: {type(e).__name__}: {e}")
 
-        self.ended_at = datetime.now().isoformat()
+        self.ended_at = timestamp()
+        if on_transition:
+            on_transition(self)
         return self
 
 class Orchestrator:
@@ -97,44 +239,68 @@ class Orchestrator:
         self.main_prompt = main_prompt
         self.agent_count = agent_count
         self.test_mode = test_mode
-        self.session_id = str(uuid.uuid4())
+        self.session_id = new_id()
         self.tasks: List[AgentTask] = []
-        self.results = {}
+        self.spawn_limit = max(1, min(agent_count, (os.cpu_count() or 4) * 2))
+        self.spawn_pool: Optional[ThreadPoolExecutor] = None
+        self.events_fh = None
+        self._last_save = 0.0
         debug_log(f"Orchestrator.__init__: session_id={self.session_id[:8]}, agents={agent_count}, test_mode={test_mode}")
 
     def ensure_dirs(self):
-        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        ensure_dirs()
+        if self.events_fh is None:
+            self.events_fh = open(ORCHESTRATOR_EVENTS_FILE, "ab", buffering=EVENTS_BUFFER_SIZE)
+
+    def record_event(self, task: AgentTask):
+        """Append one task transition to the write-ahead event log."""
+        if self.events_fh is None:
+            return
+        event = {
+            "ts": timestamp(),
+            "session_id": self.session_id,
+            "id": task.agent_id,
+            "name": task.name,
+            "status": task.status,
+            "snippet": task.result_tail[-200:]
+        }
+        self.events_fh.write(json_bytes(event) + b"\n")
+
+    def close_events(self, truncate: bool = False):
+        """Flush the event log to stable storage and close it.
+
+        With truncate=True (final snapshot already on disk) the log is emptied,
+        so it only ever covers the run in progress.
+        """
+        if self.events_fh is None:
+            return
+        self.events_fh.flush()
+        if truncate:
+            self.events_fh.truncate(0)
+        os.fsync(self.events_fh.fileno())
+        self.events_fh.close()
+        self.events_fh = None
 
     def initialize_tasks(self):
         """Divide main prompt by agent count and assign to relevant local agent."""
         debug_log(f"initialize_tasks: creating {self.agent_count} tasks")
-        # Task - Agent matching
-        agent_map = [
-            {"perspective": "Architecture & Security", "agent": "security-auditor", "skills": "security-checklist, api-patterns"},
-            {"perspective": "Backend Implementation", "agent": "backend-specialist", "skills": "nodejs-best-practices, api-patterns"},
-            {"perspective": "Frontend & UI/UX", "agent": "frontend-specialist", "skills": "react-patterns, tailwind-patterns"},
-            {"perspective": "Testing", "agent": "test-engineer", "skills": "testing-patterns, webapp-testing"},
-            {"perspective": "DevOps & Performance", "agent": "devops-engineer", "skills": "deployment-procedures, server-management"}
-        ]
-        
         for i in range(self.agent_count):
-            map_item = agent_map[i % len(agent_map)]
-            perspective = map_item["perspective"]
-            agent_name = map_item["agent"]
-            skills = map_item["skills"]
+            perspective, agent_name, skills = AGENT_MAP[i % len(AGENT_MAP)]
             
             # Sub-agent tetikleyici komut ekle
             sub_prompt = f"Use the {agent_name} agent with {skills} skills to focus on {perspective}: {self.main_prompt}"
 
-            agent_id = str(uuid.uuid4())
-            task = AgentTask(agent_id, sub_prompt, f"{agent_name}")
+            agent_id = new_id()
+            output_file = REPORTS_DIR / f"agent_{self.session_id[:8]}_{agent_id[:8]}.md"
+            task = AgentTask(agent_id, sub_prompt, f"{agent_name}", output_file)
             self.tasks.append(task)
+            self.record_event(task)
             debug_log(f"Task created: {agent_name} ({perspective})")
 
     def save_state(self):
         state = {
             "session_id": self.session_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp(),
             "main_prompt": self.main_prompt,
             "tasks": [
                 {
@@ -143,91 +309,124 @@ class Orchestrator:
                     "status": t.status,
                     "started_at": t.started_at,
                     "ended_at": t.ended_at,
-                    "result_snippet": t.result[:200] if t.result else ""
+                    "result_snippet": t.result_tail[-200:]
                 } for t in self.tasks
             ]
         }
-        ORCHESTRATOR_STATE_FILE.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+        # Atomic snapshot: write a sibling temp file, then swap it into place
+        fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, prefix=".orchestrator-state.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json_bytes(state))
+            os.replace(tmp_path, ORCHESTRATOR_STATE_FILE)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._last_save = time.monotonic()
         debug_log(f"State saved: {len(self.tasks)} tasks")
 
-    def run(self):
+    async def _run_task(self, task: AgentTask, spawn_sem: asyncio.Semaphore):
+        """Run one task; returns (task, exception) so crashes keep the agent's name."""
+        try:
+            await task.execute(self.test_mode, self.spawn_pool, self.record_event, spawn_sem)
+            return task, None
+        except Exception as e:
+            return task, e
+
+    async def run(self):
         debug_log("Orchestrator.run: starting")
         self.ensure_dirs()
         self.initialize_tasks()
+        # Replace the previous session's snapshot before any agent starts
         self.save_state()
         
         mode_str = " (TEST MODE)" if self.test_mode else ""
         print(f"🚀 Orchestrator started: {self.session_id}{mode_str}")
         print(f"👥 Spawning {self.agent_count} parallel agents...")
         
-        with ThreadPoolExecutor(max_workers=self.agent_count) as executor:
-            futures = {executor.submit(task.execute, self.test_mode): task for task in self.tasks}
-            debug_log(f"Submitted {len(futures)} tasks to ThreadPoolExecutor")
+        # Spawn threads are created on demand, never more than spawn_limit
+        self.spawn_pool = ThreadPoolExecutor(max_workers=self.spawn_limit, thread_name_prefix="agent-spawn")
+        spawn_sem = asyncio.Semaphore(self.spawn_limit)
+        snapshot_saved = False
+        try:
+            futures = [asyncio.ensure_future(self._run_task(task, spawn_sem)) for task in self.tasks]
+            debug_log(f"Scheduled {len(futures)} tasks on event loop")
 
-            for future in as_completed(futures):
-                task = futures[future]
-                try:
-                    task = future.result()
+            for future in asyncio.as_completed(futures):
+                task, error = await future
+                if error is None:
                     print(f"✅ {task.name} finished: {task.status}")
                     debug_log(f"Task {task.name} finished: {task.status}")
-                except Exception as e:
-                    print(f"❌ {task.name} crashed: {e}")
-                    debug_log(f"Task {task.name} crashed: {type(e).__name__}: {e}")
+                else:
+                    print(f"❌ {task.name} crashed: {error}")
+                    debug_log(f"Task {task.name} crashed: {type(error).__name__}: {error}")
 
-                self.save_state()
+                # Debounced progress snapshot; every transition is already in the event log
+                if time.monotonic() - self._last_save > SAVE_INTERVAL:
+                    self.events_fh.flush()
+                    self.save_state()
 
-        self.synthesize()
+            # Final snapshot is always written
+            self.save_state()
+            snapshot_saved = True
+            self.synthesize()
+        finally:
+            self.spawn_pool.shutdown(wait=False)
+            self.close_events(truncate=snapshot_saved)
 
     def synthesize(self):
         """Collect all agent results and create a synthesis."""
         debug_log("Synthesis: starting")
         print("\n🧠 Synthesizing results...")
-        
-        synthesis_content = f"# Parallel Agents Synthesis Report\n"
-        synthesis_content += f"**Session ID**: {self.session_id}\n"
-        synthesis_content += f"**Main Objective**: {self.main_prompt}\n\n"
-        synthesis_content += "---\n\n"
-        
-        for t in self.tasks:
-            synthesis_content += f"### {t.name}\n"
-            synthesis_content += f"- **Task**: {t.prompt[:100]}...\n"
-            synthesis_content += f"- **Status**: {t.status}\n"
-            synthesis_content += f"- **Key Findings**:\n\n{t.result if t.result else 'No output generated.'}\n\n"
-            synthesis_content += "---\n\n"
-        
-        reports_dir = DATA_DIR / "reports"
-        reports_dir.mkdir(parents=True, exist_ok=True)
-        report_file = reports_dir / f"synthesis_report_{self.session_id[:8]}.md"
-        report_file.write_text(synthesis_content, encoding="utf-8")
+
+        report_file = REPORTS_DIR / f"synthesis_report_{self.session_id[:8]}.md"
+
+        # Write sections straight to the buffered file; the report never exists as one string
+        with open(report_file, "w", encoding="utf-8", buffering=REPORT_BUFFER_SIZE) as report_fh:
+            report_fh.write(
+                "# Parallel Agents Synthesis Report\n"
+                f"**Session ID**: {self.session_id}\n"
+                f"**Main Objective**: {self.main_prompt}\n\n"
+                "---\n\n"
+            )
+            for t in self.tasks:
+                report_fh.write(
+                    f"### {t.name}\n"
+                    f"- **Task**: {t.prompt[:100]}...\n"
+                    f"- **Status**: {t.status}\n"
+                    "- **Key Findings**:\n\n"
+                )
+                if t.output_file and t.output_file.exists() and t.output_file.stat().st_size:
+                    with open(t.output_file, "r", encoding="utf-8", errors="replace") as agent_fh:
+                        shutil.copyfileobj(agent_fh, report_fh, REPORT_BUFFER_SIZE)
+                else:
+                    report_fh.write("No output generated.")
+                report_fh.write("\n\n---\n\n")
+                # Remove the per-agent file even when it was empty
+                if t.output_file:
+                    t.output_file.unlink(missing_ok=True)
 
         print(f"✨ Final synthesis report generated: {report_file}")
         debug_log(f"Synthesis report saved: {report_file}")
         
 def main():
+    ensure_dirs()
     debug_log(f"MAIN called: argv={sys.argv}")
 
-    if len(sys.argv) < 2:
-        print("Usage: python scripts/parallel_orchestrator.py \"your task\" [--agents N] [--test]")
-        return
-    
-    prompt = sys.argv[1]
-    agents = 3
-    test_mode = "--test" in sys.argv
-
-    debug_log(f"Parsed: prompt={prompt[:50]}..., agents={agents}, test_mode={test_mode}")
-
-    if "--agents" in sys.argv:
-        idx = sys.argv.index("--agents")
-        if idx + 1 < len(sys.argv):
-            try:
-                agents = int(sys.argv[idx + 1])
-                debug_log(f"Agent count set to: {agents}")
-            except ValueError:
-                debug_log(f"Invalid agent count, using default: {agents}")
+    parser = argparse.ArgumentParser(description="Run multiple local agents in parallel and synthesize their results.")
+    parser.add_argument("prompt", help="Main task shared by all agents")
+    parser.add_argument("--agents", type=int, default=3, help="Number of parallel agents")
+    parser.add_argument("--test", action="store_true", help="Mock agent execution instead of calling claude")
+
+    args = parser.parse_args()
+    if args.agents < 1:
+        parser.error("--agents must be at least 1")
+
+    debug_log(f"Parsed: prompt={args.prompt[:50]}..., agents={args.agents}, test_mode={args.test}")
 
     try:
-        orchestrator = Orchestrator(prompt, agents, test_mode)
-        orchestrator.run()
+        orchestrator = Orchestrator(args.prompt, args.agents, args.test)
+        asyncio.run(orchestrator.run())
         debug_log("Orchestrator.run completed")
     except Exception as e:
         debug_log(f"ORCHESTRATOR ERROR: {type(e).__name__}: {e}")
@@ -237,6 +436,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-if __name__ == "__main__":
-    main()
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import runpy
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "parallel_orchestrator.py"
+
+FAKE_CLAUDE = """#!/bin/sh
+case "$1" in
+    *Testing*) echo "boom" >&2; exit 3;;
+    *Frontend*) exit 0;;
+    *) echo "findings for: $1";;
+esac
+"""
+
+
+def test_main_guard_runs_orchestrator_once(tmp_path, monkeypatch):
+    """Running the script must start exactly one orchestration."""
+    calls = []
+
+    def fake_run(coro):
+        calls.append(coro.__qualname__)
+        coro.close()
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    monkeypatch.setattr(sys, "argv", [str(SCRIPT), "regression task", "--agents", "1", "--test"])
+    monkeypatch.setattr(asyncio, "run", fake_run)
+
+    runpy.run_path(str(SCRIPT), run_name="__main__")
+
+    assert calls == ["Orchestrator.run"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fake claude CLI is a shell script")
+def test_failing_and_silent_agents_leave_no_agent_files(tmp_path):
+    """Per-agent output files are removed after synthesis, even when empty."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    fake = bin_dir / "claude"
+    fake.write_text(FAKE_CLAUDE)
+    fake.chmod(0o755)
+    env = dict(os.environ, HOME=str(tmp_path), PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    subprocess.run([sys.executable, str(SCRIPT), "regression task", "--agents", "6"],
+                   env=env, check=True, capture_output=True, timeout=60)
+
+    reports = tmp_path / ".claude" / "data" / "reports"
+    assert len(list(reports.glob("synthesis_report_*.md"))) == 1
+    assert list(reports.glob("agent_*.md")) == []